@@ -16,6 +16,29 @@ from typing import List, Dict, Optional, Tuple
 import urllib.parse
 from pathlib import Path
 import os
+import heapq
+import itertools
+import shutil
+import tempfile
+import contextlib
+import tracemalloc
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# 因時間或筆數限制而未查詢的單字（不代表辭典沒有用例）
+UNPROCESSED_REASON = "未處理"
+
+# 輸出排序：成功記錄依品質由高至低、再依單字；缺失單字依原始順序
+QUALITY_ORDER = {'完整': 4, '良好': 3, '基本': 2, '不完整': 1}
+
+def result_sort_key(record: Dict) -> Tuple[int, str]:
+    """成功記錄排序鍵"""
+    return (-QUALITY_ORDER.get(record.get('data_quality'), 0), record['word'])
+
+def missing_sort_key(missing: Dict) -> int:
+    """缺失單字排序鍵"""
+    return missing['index']
 
 class SutianFinalScraper:
     """最終版手動操作風格爬蟲（含缺失單字報告）"""
@@ -40,35 +63,65 @@ class SutianFinalScraper:
         import urllib3
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
         self.session.verify = False
+
+        # 記憶體剖析（enable_memory_profile 啟用）與管線監控（管線模式執行後才有）
+        self.memory_profiler = None
+        self.pipeline_monitor = None
+
+    @classmethod
+    def parser_only(cls) -> 'SutianFinalScraper':
+        """只使用解析方法的實例，不建立連線、不查詢 User-Agent"""
+        scraper = cls.__new__(cls)
+        scraper.memory_profiler = None
+        scraper.pipeline_monitor = None
+        return scraper
     
     def search_word_examples(self, word: str) -> List[Dict[str, str]]:
-        """步驟1：輸入單字，獲取所有用例"""
+        """步驟1：輸入單字，獲取所有用例（下載失敗時返回空列表）"""
+        examples, _ = self._search_word_examples(word)
+        return examples
+
+    def _search_word_examples(self, word: str) -> Tuple[List[Dict[str, str]], Optional[str]]:
+        """步驟1：輸入單字，返回用例與下載錯誤
+
+        下載失敗時錯誤為「錯誤: ...」（與管線模式相同），
+        以免連線問題被記為「無用例」
+        """
         print(f"🔍 輸入單字：{word}")
-        
+
         try:
-            # 構建查詢URL（就像在網頁上輸入單字）
-            params = {
-                'lui': 'tai_ku',  # 用臺灣台語查用例
-                'tsha': word
-            }
-            
-            search_url = f"https://sutian.moe.edu.tw/zh-hant/tshiau/?{urllib.parse.urlencode(params)}"
-            print(f"   📡 查詢網址：{search_url}")
-            
-            response = self.session.get(search_url, timeout=15)
-            
-            if response.status_code == 200:
-                examples = self._parse_webpage_examples(response.text, word)
-                print(f"   ✅ 找到 {len(examples)} 個可選用例")
-                return examples
-            else:
-                print(f"   ❌ 網頁載入失敗，狀態碼: {response.status_code}")
-                return []
-                
+            with self._profile_stage('下載'):
+                html = self.fetch_word_page(word)
         except Exception as e:
             print(f"   ❌ 查詢時發生錯誤: {e}")
-            return []
-    
+            return [], f"錯誤: {e}"
+        if html is None:
+            return [], "錯誤: 網頁載入失敗"
+
+        with self._profile_stage('解析'):
+            examples = self._parse_webpage_examples(html, word)
+        print(f"   ✅ 找到 {len(examples)} 個可選用例")
+        return examples, None
+
+    def fetch_word_page(self, word: str) -> Optional[str]:
+        """下載單字的用例查詢網頁，載入失敗時返回 None（連線錯誤會直接拋出）"""
+        # 構建查詢URL（就像在網頁上輸入單字）
+        params = {
+            'lui': 'tai_ku',  # 用臺灣台語查用例
+            'tsha': word
+        }
+
+        search_url = f"https://sutian.moe.edu.tw/zh-hant/tshiau/?{urllib.parse.urlencode(params)}"
+        print(f"   📡 查詢網址：{search_url}")
+
+        response = self.session.get(search_url, timeout=15)
+
+        if response.status_code == 200:
+            return response.text
+
+        print(f"   ❌ 網頁載入失敗，狀態碼: {response.status_code}")
+        return None
+
     def _parse_webpage_examples(self, html: str, word: str) -> List[Dict[str, str]]:
         """解析網頁，提取所有用例（如同瀏覽網頁）"""
         examples = []
@@ -94,6 +147,8 @@ class SutianFinalScraper:
                     print(f"      {i}. 解析錯誤: {e}")
                     continue
             
+            # 立即釋放解析樹，避免大量單字時累積
+            soup.decompose()
             return examples
             
         except Exception as e:
@@ -345,7 +400,14 @@ class SutianFinalScraper:
         print("-" * 50)
         
         # 步驟1：輸入單字，獲取用例
-        examples = self.search_word_examples(word)
+        examples, error = self._search_word_examples(word)
+        if error:
+            return None, error
+        with self._profile_stage('選擇與儲存'):
+            return self.select_and_record(word, examples)
+
+    def select_and_record(self, word: str, examples: List[Dict[str, str]]) -> Tuple[Optional[Dict[str, str]], str]:
+        """步驟2~4：從已解析的用例中選擇、擷取並儲存，返回結果和狀態"""
         if not examples:
             print("   ❌ 沒有找到可用的用例")
             return None, "無用例"
@@ -368,20 +430,212 @@ class SutianFinalScraper:
         
         return record, "成功"
     
-    def process_wordlist_with_missing_report(self, wordlist: List[str]) -> Tuple[List[Dict[str, str]], List[str]]:
-        """批次處理單字列表並產生缺失報告"""
+    def process_wordlist_with_missing_report(self, wordlist: List[str],
+                                             max_results: Optional[int] = None,
+                                             time_budget_minutes: Optional[float] = None,
+                                             max_in_memory: Optional[int] = None) -> Tuple[List[Dict[str, str]], List[str]]:
+        """批次處理單字列表並產生缺失報告
+
+        max_results / time_budget_minutes：在 N 筆成功或 T 分鐘內提早結束，
+        其餘單字以「未處理」記入缺失清單（搭配 WordYieldScheduler 排序使用）
+        max_in_memory：記憶體上限模式，每累積此筆數就排序寫入暫存檔
+        """
         print(f"\n📚 批次手動操作模式（含缺失報告）")
         print(f"🎯 處理 {len(wordlist)} 個單字")
+        if max_results or time_budget_minutes:
+            print(f"⏱️ 限制：最多 {max_results or '不限'} 筆成功，時間 {time_budget_minutes or '不限'} 分鐘")
         print("=" * 60)
-        
-        successful_results = []
-        missing_words = []
-        
+
+        successful_results, missing_words = self._new_result_buffers(max_in_memory)
+        deadline = time.time() + time_budget_minutes * 60 if time_budget_minutes else None
+
+        try:
+            for i, word in enumerate(wordlist, 1):
+                if max_results and len(successful_results) >= max_results:
+                    stop_reason = f"已達 {max_results} 筆成功"
+                elif deadline and time.time() >= deadline:
+                    stop_reason = f"已用完 {time_budget_minutes} 分鐘"
+                else:
+                    stop_reason = None
+
+                if stop_reason:
+                    print(f"\n⏹️ 提早結束（{stop_reason}），剩餘 {len(wordlist) - i + 1} 個單字未處理")
+                    for j, skipped in enumerate(wordlist[i - 1:], i):
+                        missing_words.append({
+                            'word': skipped,
+                            'reason': UNPROCESSED_REASON,
+                            'index': j
+                        })
+                    break
+
+                print(f"\n進度 {i:2d}/{len(wordlist)}")
+
+                try:
+                    record, status = self.process_word_manual_style(word)
+                    if record:
+                        successful_results.append(record)
+                        print(f"   ✅ 成功擷取")
+                    else:
+                        missing_words.append({
+                            'word': word,
+                            'reason': status,
+                            'index': i
+                        })
+                        print(f"   ❌ 擷取失敗：{status}")
+                
+                    # 模擬人工操作間隔
+                    if i < len(wordlist):
+                        time.sleep(2.5)
+                    
+                except Exception as e:
+                    missing_words.append({
+                        'word': word,
+                        'reason': f"錯誤: {e}",
+                        'index': i
+                    })
+                    print(f"   ❌ 處理錯誤: {e}")
+                    continue
+        except BaseException:
+            # 中斷或發生未預期錯誤時刪除暫存檔
+            self._discard_result_buffers(successful_results, missing_words)
+            raise
+
+        return successful_results, missing_words
+
+    def process_wordlist_pipelined(self, wordlist: List[str],
+                                   max_results: Optional[int] = None,
+                                   time_budget_minutes: Optional[float] = None,
+                                   fetch_workers: int = 1,
+                                   parse_workers: Optional[int] = None,
+                                   queue_size: Optional[int] = None,
+                                   fetch_delay: float = 2.5,
+                                   max_in_memory: Optional[int] = None) -> Tuple[List[Dict[str, str]], List[str]]:
+        """分段管線批次處理：下載 → 多行程解析 → 選擇與儲存
+
+        各階段以有上限的佇列連接，下游來不及處理時會阻塞上游下載，
+        不會無限暫存網頁 HTML；各階段佇列深度記錄在 self.pipeline_monitor
+        max_in_memory 與 process_wordlist_with_missing_report 相同
+        """
+        parse_workers = parse_workers or os.cpu_count() or 1
+        queue_size = queue_size or parse_workers * 2
+
+        print(f"\n📚 批次管線模式（含缺失報告）")
+        print(f"🎯 處理 {len(wordlist)} 個單字")
+        print(f"⚙️ 下載 {fetch_workers} 執行緒 → 解析 {parse_workers} 行程 → 選擇與儲存，佇列上限 {queue_size}")
+        print("=" * 60)
+
+        word_queue = queue.Queue()
         for i, word in enumerate(wordlist, 1):
-            print(f"\n進度 {i:2d}/{len(wordlist)}")
-            
-            try:
-                record, status = self.process_word_manual_style(word)
+            word_queue.put((i, word))
+        html_queue = queue.Queue(maxsize=queue_size)
+        parsed_queue = queue.Queue(maxsize=queue_size)
+
+        monitor = PipelineMonitor(['下載', '解析', '選擇與儲存'],
+                                  {'解析': html_queue, '選擇與儲存': parsed_queue}, queue_size)
+        self.pipeline_monitor = monitor
+        stop_event = threading.Event()
+        deadline = time.time() + time_budget_minutes * 60 if time_budget_minutes else None
+
+        def fetch_stage(fetcher: 'SutianFinalScraper'):
+            while not stop_event.is_set() and not (deadline and time.time() >= deadline):
+                try:
+                    i, word = word_queue.get_nowait()
+                except queue.Empty:
+                    break
+
+                start = time.time()
+                try:
+                    html = fetcher.fetch_word_page(word)
+                    error = None if html is not None else "錯誤: 網頁載入失敗"
+                except Exception as e:
+                    html, error = None, f"錯誤: {e}"
+                monitor.add_busy('下載', time.time() - start)
+
+                # 佇列已滿時在此等待，由下游速度決定下載速度
+                start = time.time()
+                html_queue.put((i, word, html, error))
+                monitor.add_blocked('下載', time.time() - start)
+
+                # 模擬人工操作間隔
+                stop_event.wait(fetch_delay)
+
+        def parse_stage(pool: ProcessPoolExecutor):
+            while True:
+                item = html_queue.get()
+                if item is None:
+                    parsed_queue.put(None)
+                    break
+
+                i, word, html, error = item
+                examples = []
+                if html is not None:
+                    start = time.time()
+                    try:
+                        examples = pool.submit(_parse_page_in_worker, html, word).result()
+                    except Exception as e:
+                        error = f"錯誤: {e}"
+                    monitor.add_busy('解析', time.time() - start)
+
+                start = time.time()
+                parsed_queue.put((i, word, examples, error))
+                monitor.add_blocked('解析', time.time() - start)
+
+        def close_parse_stage(fetch_threads: List[threading.Thread]):
+            for thread in fetch_threads:
+                thread.join()
+            for _ in range(parse_workers):
+                html_queue.put(None)
+
+        successful_results, missing_words = self._new_result_buffers(max_in_memory)
+        # 每個單字 1 byte 的處理旗標
+        processed = bytearray(len(wordlist) + 1)
+        processed_count = 0
+        fetchers = [self] + [SutianFinalScraper() for _ in range(fetch_workers - 1)]
+        pool = ProcessPoolExecutor(max_workers=parse_workers, initializer=_init_parse_worker)
+
+        try:
+            fetch_threads = [threading.Thread(target=fetch_stage, args=(fetcher,), daemon=True)
+                             for fetcher in fetchers]
+            parse_threads = [threading.Thread(target=parse_stage, args=(pool,), daemon=True)
+                             for _ in range(parse_workers)]
+            for thread in fetch_threads + parse_threads:
+                thread.start()
+            threading.Thread(target=close_parse_stage, args=(fetch_threads,), daemon=True).start()
+
+            finished_parsers = 0
+            while finished_parsers < parse_workers:
+                item = parsed_queue.get()
+                if item is None:
+                    finished_parsers += 1
+                    continue
+
+                i, word, examples, error = item
+
+                # 已達筆數或時間上限：在途的項目不再選擇，結束時標記為未處理
+                if max_results and len(successful_results) >= max_results:
+                    continue
+                if deadline and time.time() >= deadline:
+                    if not stop_event.is_set():
+                        print(f"\n⏹️ 已用完 {time_budget_minutes} 分鐘，停止處理")
+                        stop_event.set()
+                    continue
+
+                processed[i] = 1
+                processed_count += 1
+                print(f"\n進度 {processed_count:2d}/{len(wordlist)}  {monitor.format_depths()}")
+                print(f"🎯 {word}")
+
+                start = time.time()
+                if error:
+                    record, status = None, error
+                else:
+                    try:
+                        with self._profile_stage('選擇與儲存'):
+                            record, status = self.select_and_record(word, examples)
+                    except Exception as e:
+                        record, status = None, f"錯誤: {e}"
+                monitor.add_busy('選擇與儲存', time.time() - start)
+
                 if record:
                     successful_results.append(record)
                     print(f"   ✅ 成功擷取")
@@ -392,24 +646,42 @@ class SutianFinalScraper:
                         'index': i
                     })
                     print(f"   ❌ 擷取失敗：{status}")
-                
-                # 模擬人工操作間隔
-                if i < len(wordlist):
-                    time.sleep(2.5)
-                    
-            except Exception as e:
+
+                if max_results and len(successful_results) >= max_results and not stop_event.is_set():
+                    print(f"\n⏹️ 已達 {max_results} 筆成功，停止處理")
+                    stop_event.set()
+        except BaseException:
+            # 中斷或發生未預期錯誤時刪除暫存檔
+            self._discard_result_buffers(successful_results, missing_words)
+            raise
+        finally:
+            stop_event.set()
+            pool.shutdown()
+            for fetcher in fetchers[1:]:
+                fetcher.cleanup()
+
+        for i, word in enumerate(wordlist, 1):
+            if not processed[i]:
                 missing_words.append({
                     'word': word,
-                    'reason': f"錯誤: {e}",
+                    'reason': UNPROCESSED_REASON,
                     'index': i
                 })
-                print(f"   ❌ 處理錯誤: {e}")
-                continue
-        
+
+        monitor.print_report()
         return successful_results, missing_words
-    
+
     def save_results_with_missing_report(self, results: List[Dict], missing_words: List[Dict], title: str = "最終結果") -> Dict[str, str]:
-        """儲存結果並包含缺失單字報告"""
+        """儲存結果並包含缺失單字報告
+
+        results / missing_words 可為一般 list 或 SpillingRecordBuffer；
+        使用 SpillingRecordBuffer 時，排序以磁碟上的 sorted run 外部合併完成，
+        記錄逐筆寫出，不會一次載入記憶體
+        """
+        with self._profile_stage('寫出結果'):
+            return self._save_results_with_missing_report(results, missing_words, title)
+
+    def _save_results_with_missing_report(self, results: List[Dict], missing_words: List[Dict], title: str) -> Dict[str, str]:
         timestamp = time.strftime("%Y%m%d_%H%M%S")
         safe_title = re.sub(r'[\\/:*?"<>|]', '_', title)
         
@@ -417,61 +689,57 @@ class SutianFinalScraper:
         output_dir = f"final_{safe_title}"
         os.makedirs(output_dir, exist_ok=True)
         
-        total_words = len(results) + len(missing_words)
+        # 因時間或筆數限制未查詢的單字不列入統計
+        unprocessed_count = sum(1 for m in missing_words if m['reason'] == UNPROCESSED_REASON)
+        missing_count = len(missing_words) - unprocessed_count
+        total_words = len(results) + missing_count
+        quality_stats = self._calculate_quality_stats(results)
         
         # 儲存主要結果JSON
         json_file = f"{output_dir}/{safe_title}_final_{timestamp}.json"
-        json_data = {
-            'metadata': {
-                'scraper_type': '最終版手動操作風格爬蟲',
-                'operation_flow': '輸入單字 → 選擇用例 → 擷取三要素 → 儲存管理',
-                'source_url': 'https://sutian.moe.edu.tw/zh-hant/tshiau/',
-                'extraction_date': timestamp,
-                'statistics': {
-                    'total_words': total_words,
-                    'successful_extractions': len(results),
-                    'missing_words': len(missing_words),
-                    'success_rate': f"{len(results)/total_words*100:.1f}%" if total_words > 0 else "0%",
-                    'quality_stats': self._calculate_quality_stats(results)
-                }
-            },
-            'successful_records': results,
-            'missing_words': missing_words
+        metadata = {
+            'scraper_type': '最終版手動操作風格爬蟲',
+            'operation_flow': '輸入單字 → 選擇用例 → 擷取三要素 → 儲存管理',
+            'source_url': 'https://sutian.moe.edu.tw/zh-hant/tshiau/',
+            'extraction_date': timestamp,
+            'statistics': {
+                'total_words': total_words,
+                'successful_extractions': len(results),
+                'missing_words': missing_count,
+                'success_rate': f"{len(results)/total_words*100:.1f}%" if total_words > 0 else "0%",
+                'quality_stats': quality_stats
+            }
         }
+        if unprocessed_count:
+            metadata['statistics']['unprocessed_words'] = unprocessed_count
         
         with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(json_data, f, ensure_ascii=False, indent=2)
+            _write_json_report(f, metadata, results, missing_words)
         
-        # 儲存成功記錄CSV
+        # 儲存成功記錄CSV（依品質、單字排序）
         csv_file = f"{output_dir}/{safe_title}_successful_{timestamp}.csv"
         if results:
-            csv_data = []
-            
-            for record in results:
-                csv_data.append({
-                    '單字': record['word'],
-                    '台語例句': record['taiwanese_sentence'],
-                    '台羅拼音': record['tailo_pronunciation'],
-                    '中文翻譯': record['chinese_translation'],
-                    '來源詞目': record['source_word'],
-                    '資料品質': record['data_quality'],
-                    '擷取時間': record['extraction_time'],
-                    '資料來源': record['source']
-                })
-            
-            df = pd.DataFrame(csv_data)
-            quality_order = {'完整': 4, '良好': 3, '基本': 2, '不完整': 1}
-            df['品質分數'] = df['資料品質'].map(quality_order).fillna(0)
-            df = df.sort_values(['品質分數', '單字'], ascending=[False, True])
-            df = df.drop('品質分數', axis=1)
-            df.to_csv(csv_file, index=False, encoding='utf-8-sig')
+            csv_rows = ({
+                '單字': record['word'],
+                '台語例句': record['taiwanese_sentence'],
+                '台羅拼音': record['tailo_pronunciation'],
+                '中文翻譯': record['chinese_translation'],
+                '來源詞目': record['source_word'],
+                '資料品質': record['data_quality'],
+                '擷取時間': record['extraction_time'],
+                '資料來源': record['source']
+            } for record in _iter_sorted(results, result_sort_key))
+            _write_csv_in_chunks(csv_file, csv_rows)
         
         # 儲存缺失單字CSV
         missing_csv_file = f"{output_dir}/{safe_title}_missing_words_{timestamp}.csv"
         if missing_words:
-            missing_df = pd.DataFrame(missing_words)
-            missing_df = missing_df.sort_values('index')
-            missing_df.to_csv(missing_csv_file, index=False, encoding='utf-8-sig')
+            _write_csv_in_chunks(missing_csv_file, _iter_sorted(missing_words, missing_sort_key))
+        
+        # 終端機摘要最多列出的原因數（錯誤訊息可能每個單字都不同）
+        max_summary_reasons = 20
+        reason_summary = []
+        other_reason_count = 0
         
         # 儲存完整報告TXT
         txt_file = f"{output_dir}/{safe_title}_complete_report_{timestamp}.txt"
@@ -482,19 +750,18 @@ class SutianFinalScraper:
             f.write(f"📊 完整統計：\n")
             f.write(f"   - 總計單字：{total_words} 個\n")
             f.write(f"   - 成功擷取：{len(results)} 個\n")
-            f.write(f"   - 缺失單字：{len(missing_words)} 個\n")
+            f.write(f"   - 缺失單字：{missing_count} 個\n")
             f.write(f"   - 成功率：{len(results)/total_words*100:.1f}%\n" if total_words > 0 else "   - 成功率：0%\n")
+            if unprocessed_count:
+                f.write(f"   - 未處理：{unprocessed_count} 個（未查詢，不列入統計）\n")
             f.write(f"⏰ 擷取時間：{timestamp}\n\n")
             
-            # 成功擷取的結果
+            # 成功擷取的結果（每個品質分組各掃描一次，避免複製整份記錄）
             if results:
-                complete_records = [r for r in results if r['data_quality'] == '完整']
-                good_records = [r for r in results if r['data_quality'] == '良好']
-                basic_records = [r for r in results if r['data_quality'] == '基本']
-                
-                if complete_records:
+                if quality_stats['完整']:
                     f.write("🌟 完整擷取（台語+台羅+中文）:\n")
                     f.write("-" * 60 + "\n")
+                    complete_records = (r for r in results if r['data_quality'] == '完整')
                     for i, record in enumerate(complete_records, 1):
                         f.write(f"{i:2d}. {record['word']}\n")
                         f.write(f"    台語：{record['taiwanese_sentence']}\n")
@@ -504,9 +771,10 @@ class SutianFinalScraper:
                             f.write(f"    來源：{record['source_word']}\n")
                         f.write("\n")
                 
-                if good_records:
+                if quality_stats['良好']:
                     f.write("📝 良好擷取:\n")
                     f.write("-" * 60 + "\n")
+                    good_records = (r for r in results if r['data_quality'] == '良好')
                     for i, record in enumerate(good_records, 1):
                         f.write(f"{i:2d}. {record['word']}\n")
                         f.write(f"    台語：{record['taiwanese_sentence']}\n")
@@ -516,44 +784,47 @@ class SutianFinalScraper:
                             f.write(f"    中文：{record['chinese_translation']}\n")
                         f.write("\n")
                 
-                if basic_records:
+                if quality_stats['基本']:
                     f.write("📄 基本擷取:\n")
                     f.write("-" * 60 + "\n")
+                    basic_records = (r for r in results if r['data_quality'] == '基本')
                     for i, record in enumerate(basic_records, 1):
                         f.write(f"{i:2d}. {record['word']}\n")
                         f.write(f"    台語：{record['taiwanese_sentence']}\n")
                         f.write("\n")
             
             # 缺失單字報告
-            if missing_words:
+            if missing_count:
                 f.write("❌ 缺失單字報告:\n")
                 f.write("=" * 60 + "\n")
-                f.write(f"以下 {len(missing_words)} 個單字沒有找到可用的例句：\n\n")
-                
-                # 按原因分組
-                reasons = {}
-                for missing in missing_words:
-                    reason = missing['reason']
-                    if reason not in reasons:
-                        reasons[reason] = []
-                    reasons[reason].append(missing['word'])
+                f.write(f"以下 {missing_count} 個單字沒有找到可用的例句：\n\n")
                 
-                for reason, words in reasons.items():
-                    f.write(f"📋 {reason} ({len(words)}個):\n")
-                    for i, word in enumerate(words, 1):
-                        if i % 10 == 1:
-                            f.write("   ")
-                        f.write(f"{word:<8}")
-                        if i % 10 == 0:
-                            f.write("\n")
-                    if len(words) % 10 != 0:
-                        f.write("\n")
+                for reason, count, words in _iter_reason_groups(missing_words):
+                    if reason == UNPROCESSED_REASON:
+                        continue
+                    f.write(f"📋 {reason} ({count}個):\n")
+                    samples = []
+                    _write_word_grid(f, _collect_samples(words, samples, 5))
                     f.write("\n")
+                    if len(reason_summary) < max_summary_reasons:
+                        reason_summary.append((reason, count, samples))
+                    else:
+                        other_reason_count += 1
                 
                 f.write("💡 建議：\n")
                 f.write("   1. 這些單字可能在教育部辭典中沒有用例\n")
                 f.write("   2. 可以嘗試其他台語辭典或資源\n")
                 f.write("   3. 或者手動查詢相關的同義詞\n")
+            
+            # 因時間或筆數限制尚未查詢的單字
+            if unprocessed_count:
+                if missing_count:
+                    f.write("\n")
+                f.write(f"⏸️ 未處理（可補跑）({unprocessed_count}個):\n")
+                f.write("=" * 60 + "\n")
+                _write_word_grid(f, (m['word'] for m in missing_words if m['reason'] == UNPROCESSED_REASON))
+                f.write("\n")
+                f.write("💡 這些單字尚未查詢，並非辭典中沒有用例，可再次執行補跑\n")
         
         print(f"\n💾 最終結果已儲存:")
         print(f"   📊 完整JSON: {json_file}")
@@ -564,19 +835,15 @@ class SutianFinalScraper:
         print(f"   📖 完整報告: {txt_file}")
         
         # 顯示缺失摘要
-        if missing_words:
+        if reason_summary:
             print(f"\n❌ 缺失單字摘要：")
-            reasons = {}
-            for missing in missing_words:
-                reason = missing['reason']
-                if reason not in reasons:
-                    reasons[reason] = []
-                reasons[reason].append(missing['word'])
-            
-            for reason, words in reasons.items():
-                print(f"   {reason}: {len(words)}個")
-                sample_words = words[:5]
-                print(f"     如：{', '.join(sample_words)}{'...' if len(words) > 5 else ''}")
+            for reason, count, sample_words in reason_summary:
+                print(f"   {reason}: {count}個")
+                print(f"     如：{', '.join(sample_words)}{'...' if count > 5 else ''}")
+            if other_reason_count:
+                print(f"   …另有 {other_reason_count} 種原因，詳見完整報告")
+        if unprocessed_count:
+            print(f"\n⏸️ 未處理（可補跑）：{unprocessed_count}個")
         
         return {
             'json_file': json_file,
@@ -597,11 +864,478 @@ class SutianFinalScraper:
         
         return stats
     
+    def _new_result_buffers(self, max_in_memory: Optional[int]):
+        """建立成功記錄與缺失單字的容器（設定上限時改用可寫入磁碟的緩衝區）"""
+        if not max_in_memory:
+            return [], []
+        return (SpillingRecordBuffer(result_sort_key, max_in_memory),
+                SpillingRecordBuffer(missing_sort_key, max_in_memory))
+
+    @staticmethod
+    def _discard_result_buffers(*buffers):
+        """刪除 SpillingRecordBuffer 的暫存檔（一般 list 不需處理）"""
+        for buffer in buffers:
+            if isinstance(buffer, SpillingRecordBuffer):
+                buffer.cleanup()
+
+    def enable_memory_profile(self, top_n: int = 10, sample_every: int = 20):
+        """啟用 tracemalloc 記憶體剖析，依階段統計配置位置
+
+        管線模式中解析在子行程執行，不列入統計；背景下載執行緒的配置
+        可能被計入同時進行的階段
+        """
+        self.memory_profiler = MemoryProfiler(top_n, sample_every)
+        self.memory_profiler.start()
+        return self.memory_profiler
+
+    def _profile_stage(self, stage: str):
+        """記憶體剖析階段（未啟用剖析時不做任何事）"""
+        if self.memory_profiler is None:
+            return contextlib.nullcontext()
+        return self.memory_profiler.measure(stage)
+
     def cleanup(self):
         """清理資源"""
         if hasattr(self, 'session'):
             self.session.close()
 
+# 解析行程中重複使用的爬蟲實例（只使用其解析方法）
+_parse_worker_scraper: Optional[SutianFinalScraper] = None
+
+def _init_parse_worker():
+    """解析行程初始化"""
+    global _parse_worker_scraper
+    # fork 時會繼承主行程的 tracemalloc；解析行程的配置不會被回報，停止以免白白付出追蹤成本
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _parse_worker_scraper = SutianFinalScraper.parser_only()
+
+def _parse_page_in_worker(html: str, word: str) -> List[Dict[str, str]]:
+    """在解析行程中解析網頁用例"""
+    return _parse_worker_scraper._parse_webpage_examples(html, word)
+
+def _iter_sorted(records, sort_key):
+    """依排序鍵輸出記錄（SpillingRecordBuffer 本身已是排序後的合併結果）"""
+    if isinstance(records, SpillingRecordBuffer) and records.sort_key is sort_key:
+        return iter(records)
+    return iter(sorted(records, key=sort_key))
+
+def _write_csv_in_chunks(csv_file: str, rows, chunk_size: int = 5000):
+    """分批寫出 CSV，避免一次把所有資料轉成 DataFrame"""
+    with open(csv_file, 'w', encoding='utf-8-sig', newline='') as f:
+        chunk = []
+        header = True
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                pd.DataFrame(chunk).to_csv(f, index=False, header=header)
+                header = False
+                chunk = []
+        if chunk or header:
+            pd.DataFrame(chunk).to_csv(f, index=False, header=header)
+
+def reason_sort_key(missing: Dict) -> Tuple[str, int]:
+    """缺失單字依原因分組的排序鍵"""
+    return (missing['reason'], missing['index'])
+
+def _iter_reason_groups(missing_words):
+    """依原因分組輸出 (原因, 單字數, 單字)
+
+    一般 list 依原因首次出現的順序分組；SpillingRecordBuffer 以外部排序分組，
+    每組單字先寫入暫存檔計數，不會一次載入記憶體
+    """
+    if not isinstance(missing_words, SpillingRecordBuffer):
+        reasons = {}
+        for missing in missing_words:
+            reasons.setdefault(missing['reason'], []).append(missing['word'])
+        for reason, words in reasons.items():
+            yield reason, len(words), words
+        return
+
+    with missing_words.resorted(reason_sort_key) as by_reason:
+        for reason, group in itertools.groupby(by_reason, key=lambda m: m['reason']):
+            with tempfile.SpooledTemporaryFile(max_size=1 << 20, mode='w+', encoding='utf-8') as spool:
+                count = 0
+                for missing in group:
+                    spool.write(missing['word'] + '\n')
+                    count += 1
+                spool.seek(0)
+                yield reason, count, (line.rstrip('\n') for line in spool)
+
+def _collect_samples(words, samples: List[str], limit: int):
+    """逐一輸出單字，並保留前幾個作為摘要範例"""
+    for word in words:
+        if len(samples) < limit:
+            samples.append(word)
+        yield word
+
+def _write_word_grid(f, words) -> int:
+    """每行 10 個單字寫出單字清單，返回單字數"""
+    count = 0
+    for count, word in enumerate(words, 1):
+        if count % 10 == 1:
+            f.write("   ")
+        f.write(f"{word:<8}")
+        if count % 10 == 0:
+            f.write("\n")
+    if count % 10 != 0:
+        f.write("\n")
+    return count
+
+def _write_json_report(f, metadata: Dict, results, missing_words):
+    """逐筆寫出 JSON 報告，格式與 json.dump(indent=2) 相同"""
+    def dumps(obj, level: int) -> str:
+        return json.dumps(obj, ensure_ascii=False, indent=2).replace('\n', '\n' + '  ' * level)
+
+    f.write('{\n  "metadata": ' + dumps(metadata, 1))
+    for key, items in (('successful_records', results), ('missing_words', missing_words)):
+        f.write(f',\n  "{key}": [')
+        first = True
+        for item in items:
+            f.write(('\n' if first else ',\n') + '    ' + dumps(item, 2))
+            first = False
+        f.write(']' if first else '\n  ]')
+    f.write('\n}')
+
+class SpillingRecordBuffer:
+    """記憶體上限的記錄緩衝區
+
+    累積到 max_in_memory 筆時，依 sort_key 排序後寫入暫存檔（sorted run）；
+    迭代時以 heapq.merge 外部合併所有 run，依排序逐筆輸出。
+    同一層的 run 達到 max_fan_in 個時先合併成上一層的 run，
+    因此同時開啟的暫存檔不會超過 max_fan_in 個
+    """
+
+    def __init__(self, sort_key, max_in_memory: int = 10000, spill_dir: Optional[str] = None,
+                 max_fan_in: int = 64):
+        self.sort_key = sort_key
+        self.max_in_memory = max_in_memory
+        self.spill_dir = spill_dir
+        self.max_fan_in = max_fan_in
+        self._memory: List[Dict] = []
+        # (層級, 檔案路徑)，依建立順序排列，層級由前往後遞減
+        self._runs: List[Tuple[int, str]] = []
+        self._run_counter = 0
+        self._count = 0
+        self._tmpdir: Optional[str] = None
+
+    def __enter__(self) -> 'SpillingRecordBuffer':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cleanup()
+
+    def append(self, record: Dict):
+        self._memory.append(record)
+        self._count += 1
+        if len(self._memory) >= self.max_in_memory:
+            self._spill()
+
+    def _new_run_file(self) -> str:
+        if self._tmpdir is None:
+            self._tmpdir = tempfile.mkdtemp(prefix='sutian_runs_', dir=self.spill_dir)
+        self._run_counter += 1
+        return os.path.join(self._tmpdir, f"run_{self._run_counter:06d}.jsonl")
+
+    @staticmethod
+    def _write_run(run_file: str, records):
+        with open(run_file, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def _spill(self):
+        self._memory.sort(key=self.sort_key)
+        run_file = self._new_run_file()
+        self._write_run(run_file, self._memory)
+        self._runs.append((0, run_file))
+        self._memory = []
+
+        # 尾端同一層的 run 達上限時合併為上一層（合併相鄰的 run，維持排序穩定）
+        while len(self._runs) >= self.max_fan_in:
+            tail = self._runs[-self.max_fan_in:]
+            level = tail[0][0]
+            if any(run_level != level for run_level, _ in tail):
+                break
+            self._merge_tail(level + 1)
+
+    def _merge_tail(self, level: int):
+        """將尾端 max_fan_in 個 run 合併成一個"""
+        tail = self._runs[-self.max_fan_in:]
+        merged_file = self._new_run_file()
+        self._write_run(merged_file, heapq.merge(*[self._read_run(path) for _, path in tail],
+                                                 key=self.sort_key))
+        for _, path in tail:
+            os.remove(path)
+        del self._runs[-self.max_fan_in:]
+        self._runs.append((level, merged_file))
+
+    @staticmethod
+    def _read_run(run_file: str):
+        with open(run_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self):
+        # 多層 run 的總數仍可能超過上限，讀取前先從尾端合併
+        while len(self._runs) >= self.max_fan_in:
+            self._merge_tail(max(level for level, _ in self._runs[-self.max_fan_in:]) + 1)
+
+        runs = [self._read_run(path) for _, path in self._runs]
+        runs.append(iter(sorted(self._memory, key=self.sort_key)))
+        return heapq.merge(*runs, key=self.sort_key)
+
+    def resorted(self, sort_key) -> 'SpillingRecordBuffer':
+        """以另一個排序鍵建立新的緩衝區（外部排序，使用完需 cleanup）"""
+        buffer = SpillingRecordBuffer(sort_key, self.max_in_memory, self.spill_dir, self.max_fan_in)
+        try:
+            for record in self:
+                buffer.append(record)
+        except BaseException:
+            buffer.cleanup()
+            raise
+        return buffer
+
+    def cleanup(self):
+        """刪除暫存檔"""
+        if self._tmpdir is not None:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
+        self._runs = []
+        self._memory = []
+        self._count = 0
+
+class MemoryProfiler:
+    """以 tracemalloc 依階段統計記憶體配置位置
+
+    每個階段每 sample_every 次取樣一次（前後快照比較），
+    累計各程式位置的淨配置量，執行結束時列出各階段前幾名
+    """
+
+    def __init__(self, top_n: int = 10, sample_every: int = 20):
+        self.top_n = top_n
+        self.sample_every = sample_every
+        self.stage_counts: Dict[str, int] = {}
+        self.stage_sites: Dict[str, Dict[str, int]] = {}
+        self._started_tracing = False
+        self._filters = (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        )
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self):
+        # 只停止由自己啟動的追蹤，不影響其他使用 tracemalloc 的程式
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextlib.contextmanager
+    def measure(self, stage: str):
+        count = self.stage_counts.get(stage, 0)
+        self.stage_counts[stage] = count + 1
+        if count % self.sample_every != 0 or not tracemalloc.is_tracing():
+            yield
+            return
+
+        before = tracemalloc.take_snapshot().filter_traces(self._filters)
+        try:
+            yield
+        finally:
+            after = tracemalloc.take_snapshot().filter_traces(self._filters)
+            sites = self.stage_sites.setdefault(stage, {})
+            for stat in after.compare_to(before, 'lineno'):
+                if stat.size_diff:
+                    frame = stat.traceback[0]
+                    site = f"{frame.filename}:{frame.lineno}"
+                    sites[site] = sites.get(site, 0) + stat.size_diff
+
+    def top_sites(self) -> Dict[str, List[Tuple[str, int]]]:
+        """各階段淨配置量最多的程式位置"""
+        return {
+            stage: sorted(sites.items(), key=lambda item: -item[1])[:self.top_n]
+            for stage, sites in self.stage_sites.items()
+        }
+
+    def print_report(self):
+        current, peak = tracemalloc.get_traced_memory()
+        print(f"\n🧠 記憶體剖析（目前 {current / 1024 / 1024:.1f} MB，峰值 {peak / 1024 / 1024:.1f} MB）：")
+        for stage, sites in self.top_sites().items():
+            count = self.stage_counts[stage]
+            sampled = (count + self.sample_every - 1) // self.sample_every
+            print(f"   {stage}（執行 {count} 次，取樣 {sampled} 次）：")
+            for site, size in sites:
+                print(f"      {size / 1024:+10.1f} KB  {site}")
+
+class PipelineMonitor:
+    """記錄管線各階段的忙碌時間、等待下游的時間與輸入佇列深度，用來判斷瓶頸"""
+
+    def __init__(self, stages: List[str], stage_queues: Dict[str, queue.Queue], queue_size: int):
+        self.stages = stages
+        self.stage_queues = stage_queues
+        self.queue_size = queue_size
+        self.start_time = time.time()
+        self.busy_seconds = {stage: 0.0 for stage in stages}
+        self.blocked_seconds = {stage: 0.0 for stage in stages}
+        self.max_depths = {stage: 0 for stage in stage_queues}
+        self._depth_totals = {stage: 0 for stage in stage_queues}
+        self._samples = 0
+        self._lock = threading.Lock()
+
+    def add_busy(self, stage: str, seconds: float):
+        with self._lock:
+            self.busy_seconds[stage] += seconds
+
+    def add_blocked(self, stage: str, seconds: float):
+        """記錄因下游佇列已滿而等待的時間"""
+        with self._lock:
+            self.blocked_seconds[stage] += seconds
+
+    def sample(self) -> Dict[str, int]:
+        """讀取目前各階段等待中的項目數"""
+        depths = {stage: q.qsize() for stage, q in self.stage_queues.items()}
+        with self._lock:
+            self._samples += 1
+            for stage, depth in depths.items():
+                self._depth_totals[stage] += depth
+                self.max_depths[stage] = max(self.max_depths[stage], depth)
+        return depths
+
+    def format_depths(self) -> str:
+        depths = self.sample()
+        return ' | '.join(f"{stage}待處理 {depth}/{self.queue_size}" for stage, depth in depths.items())
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """各階段統計：累計忙碌與等待下游秒數；有輸入佇列的階段另含目前、最大、平均深度"""
+        depths = self.sample()
+        with self._lock:
+            stats = {}
+            for stage in self.stages:
+                stats[stage] = {
+                    'busy_seconds': round(self.busy_seconds[stage], 2),
+                    'blocked_seconds': round(self.blocked_seconds[stage], 2)
+                }
+                if stage in self.stage_queues:
+                    stats[stage].update({
+                        'depth': depths[stage],
+                        'max_depth': self.max_depths[stage],
+                        'avg_depth': round(self._depth_totals[stage] / self._samples, 2)
+                    })
+            return stats
+
+    def print_report(self):
+        elapsed = time.time() - self.start_time
+        print(f"\n📈 管線階段統計（總耗時 {elapsed:.1f} 秒，佇列上限 {self.queue_size}）：")
+        for stage, stats in self.snapshot().items():
+            line = f"   {stage}：累計忙碌 {stats['busy_seconds']} 秒，等待下游 {stats['blocked_seconds']} 秒"
+            if 'avg_depth' in stats:
+                line += f"，平均待處理 {stats['avg_depth']}，最多 {stats['max_depth']}"
+            print(line)
+        print("   💡 上游等待下游的時間長、或某階段待處理數長期接近佇列上限，代表該階段是瓶頸，可增加其工作者數量")
+
+class WordYieldScheduler:
+    """依歷史擷取結果預測單字產出率，優先處理較可能有用例的單字"""
+
+    # 只有這些原因代表辭典確實沒有用例；錯誤與未處理不列入學習
+    NEGATIVE_REASONS = ('無用例', '無效用例')
+
+    def __init__(self, history_root: str = '.'):
+        # 統計格式：[成功次數, 失敗次數]
+        self.word_stats: Dict[str, List[int]] = {}
+        self.category_stats: Dict[str, List[int]] = {}
+        self.length_stats: Dict[int, List[int]] = {}
+        self.global_stats = [0, 0]
+        self.load_history(history_root)
+
+    @staticmethod
+    def _length_bucket(word: str) -> int:
+        """單字長度分組（5字以上合併）"""
+        return min(len(word), 5)
+
+    def _record_outcome(self, word: str, category: str, success: bool):
+        slot = 0 if success else 1
+        for stats, key in ((self.word_stats, word),
+                           (self.category_stats, category),
+                           (self.length_stats, self._length_bucket(word))):
+            stats.setdefault(key, [0, 0])[slot] += 1
+        self.global_stats[slot] += 1
+
+    def load_history(self, history_root: str = '.') -> int:
+        """讀取所有 final_* 目錄中的 JSON 結果，返回載入的檔案數"""
+        loaded = 0
+        for json_file in sorted(Path(history_root).glob('final_*/*_final_*.json')):
+            category = json_file.parent.name[len('final_'):]
+            try:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception as e:
+                print(f"   ⚠️ 無法讀取歷史結果 {json_file}: {e}")
+                continue
+
+            for record in data.get('successful_records', []):
+                self._record_outcome(record['word'], category, True)
+            for missing in data.get('missing_words', []):
+                if missing.get('reason') in self.NEGATIVE_REASONS:
+                    self._record_outcome(missing['word'], category, False)
+            loaded += 1
+
+        return loaded
+
+    @staticmethod
+    def _smoothed_rate(stats: Optional[List[int]], prior: float, weight: float) -> float:
+        """以先驗值平滑的成功率（樣本少時接近先驗）"""
+        if not stats:
+            return prior
+        success, failure = stats
+        return (success + prior * weight) / (success + failure + weight)
+
+    def predict_yield(self, word: str, category: Optional[str] = None) -> float:
+        """預測單字擷取成功的機率（0~1）"""
+        total = sum(self.global_stats)
+        global_rate = self.global_stats[0] / total if total else 0.5
+
+        length_rate = self._smoothed_rate(self.length_stats.get(self._length_bucket(word)), global_rate, 5)
+        if category is not None and category in self.category_stats:
+            category_rate = self._smoothed_rate(self.category_stats[category], global_rate, 5)
+            # 以長度為主要依據，再依分類整體成功率做調整
+            base_rate = length_rate * category_rate / global_rate if global_rate else length_rate
+            base_rate = min(max(base_rate, 0.0), 1.0)
+        else:
+            base_rate = length_rate
+
+        # 曾查詢過的單字，以過去結果為主
+        return self._smoothed_rate(self.word_stats.get(word), base_rate, 1)
+
+    def order_words(self, words: List[str], category: Optional[str] = None) -> List[str]:
+        """依預測產出率由高至低排序（同分時依原順序）"""
+        return sorted(words, key=lambda w: -self.predict_yield(w, category))
+
+def _ask_positive_number(prompt: str, number_type):
+    """詢問正數，直接 Enter 返回 None；輸入無效時重新詢問"""
+    while True:
+        answer = input(prompt).strip()
+        if not answer:
+            return None
+        try:
+            value = number_type(answer)
+        except ValueError:
+            value = None
+        if value is not None and value > 0:
+            return value
+        print("❌ 請輸入大於 0 的" + ("整數" if number_type is int else "數字"))
+
+def _ask_batch_budget() -> Tuple[Optional[int], Optional[float]]:
+    """詢問批次處理的成功筆數上限與時間預算（直接 Enter 表示不限）"""
+    max_results = _ask_positive_number("最多擷取幾筆成功結果？（直接 Enter 不限）: ", int)
+    time_budget = _ask_positive_number("時間預算幾分鐘？（直接 Enter 不限）: ", float)
+    return max_results, time_budget
+
 def main():
     """最終版爬蟲主程式"""
     scraper = SutianFinalScraper()
@@ -675,19 +1409,47 @@ def main():
                                     if len(cleaned_word) > 1 and cleaned_word not in ['其他', '備註', '說明', '類別']:
                                         words.append(cleaned_word)
                         
-                        # 去重
-                        words = list(set(words))
+                        # 去重，並依歷史產出率排序（較可能有用例的先處理）
+                        words = list(dict.fromkeys(words))
                         print(f"\n📝 找到 {len(words)} 個單字")
-                        
+                        scheduler = WordYieldScheduler()
+                        words = scheduler.order_words(words, selected_ws)
+                        likely = sum(1 for w in words if scheduler.predict_yield(w, selected_ws) >= 0.5)
+                        print(f"📈 預估約 {likely} 個單字較可能有用例（已排在前面）")
+
                         # 詢問是否繼續
                         confirm = input(f"是否開始處理？(y/n): ").lower().strip()
                         if confirm == 'y':
-                            results, missing_words = scraper.process_wordlist_with_missing_report(words)
-                            
-                            saved = scraper.save_results_with_missing_report(results, missing_words, selected_ws)
-                            if saved:
-                                print(f"\n🎉 工作表「{selected_ws}」處理完成！")
-                                print(f"📁 結果儲存在：{saved['output_dir']}")
+                            max_results, time_budget = _ask_batch_budget()
+
+                            use_pipeline = input("使用多核心管線模式？(y/n): ").lower().strip() == 'y'
+                            max_in_memory = _ask_positive_number("記憶體上限模式：每幾筆寫入暫存檔？（直接 Enter 不使用）: ", int)
+                            if input("記錄記憶體配置剖析？(y/n): ").lower().strip() == 'y':
+                                scraper.enable_memory_profile()
+
+                            try:
+                                if use_pipeline:
+                                    results, missing_words = scraper.process_wordlist_pipelined(
+                                        words, max_results=max_results, time_budget_minutes=time_budget,
+                                        max_in_memory=max_in_memory)
+                                else:
+                                    results, missing_words = scraper.process_wordlist_with_missing_report(
+                                        words, max_results=max_results, time_budget_minutes=time_budget,
+                                        max_in_memory=max_in_memory)
+
+                                try:
+                                    saved = scraper.save_results_with_missing_report(results, missing_words, selected_ws)
+                                finally:
+                                    scraper._discard_result_buffers(results, missing_words)
+                                if saved:
+                                    print(f"\n🎉 工作表「{selected_ws}」處理完成！")
+                                    print(f"📁 結果儲存在：{saved['output_dir']}")
+                            finally:
+                                # 處理或儲存失敗時也要停止剖析，避免 tracemalloc 持續拖慢之後的操作
+                                if scraper.memory_profiler:
+                                    scraper.memory_profiler.print_report()
+                                    scraper.memory_profiler.stop()
+                                    scraper.memory_profiler = None
                         else:
                             print("👋 已取消操作")
                     else:
@@ -707,7 +1469,11 @@ def main():
                     words.append(word)
                 
                 if words:
-                    results, missing_words = scraper.process_wordlist_with_missing_report(words)
+                    # 去重，並依歷史產出率排序（無分類資訊，只依單字長度與過去結果）
+                    words = WordYieldScheduler().order_words(list(dict.fromkeys(words)))
+                    max_results, time_budget = _ask_batch_budget()
+                    results, missing_words = scraper.process_wordlist_with_missing_report(
+                        words, max_results=max_results, time_budget_minutes=time_budget)
                     saved = scraper.save_results_with_missing_report(results, missing_words, "自定義列表")
                     if saved:
                         print(f"\n🎉 自定義列表處理完成！")
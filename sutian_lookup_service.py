@@ -0,0 +1,410 @@
+# -*- coding: utf-8 -*-
+"""
+台語例句本機查詢服務
+Local Lookup Service - serves collected example sentences over HTTP/JSON
+預載 final_* 語料 + 記憶體 LRU + 背景爬取佇列
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sutian_final_scraper import SutianFinalScraper, WordYieldScheduler
+
+class LRUCache:
+    """執行緒安全的 LRU 快取（單字 → 已序列化的查詢結果 JSON）"""
+
+    def __init__(self, capacity: int = 50000):
+        self.capacity = capacity
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.capacity:
+                self._data.popitem(last=False)
+
+    def pop(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+class LookupStats:
+    """命中率與延遲統計
+
+    命中率以單字計算（語料中已有結果即為命中）；延遲以 HTTP 請求計算，
+    包含解析請求與輸出 JSON，保留最近的樣本計算百分位數
+    """
+
+    def __init__(self, window: int = 10000):
+        self.hits = 0
+        self.misses = 0
+        self.cache_hits = 0
+        self.requests = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record_lookup(self, hit: bool, cache_hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            if cache_hit:
+                self.cache_hits += 1
+
+    def record_request(self, latency_ms: float):
+        with self._lock:
+            self.requests += 1
+            self._latencies.append(latency_ms)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            hits, misses, cache_hits, requests = self.hits, self.misses, self.cache_hits, self.requests
+        total = hits + misses
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            index = min(len(latencies) - 1, int(round(p / 100 * (len(latencies) - 1))))
+            return round(latencies[index], 3)
+
+        return {
+            'lookups': total,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else 0.0,
+            'lru_hit_rate': round(cache_hits / total, 4) if total else 0.0,
+            'requests': requests,
+            'latency_ms': {
+                'p50': percentile(50),
+                'p90': percentile(90),
+                'p99': percentile(99),
+                'max': round(latencies[-1], 3) if latencies else 0.0,
+            }
+        }
+
+class SutianLookupService:
+    """以 SutianFinalScraper 的記錄格式提供單字例句查詢
+
+    完整語料（單字 → 結果）常駐記憶體作為主要資料來源，LRU 只快取熱門單字
+    已序列化的 JSON；只有語料中沒有的單字才會排入背景爬取
+    """
+
+    def __init__(self, corpus_root: str = '.', capacity: int = 50000, scrape_delay: float = 2.5,
+                 max_pending: int = 200):
+        self.corpus_root = corpus_root
+        self.corpus: Dict[str, Dict] = {}
+        self._corpus_lock = threading.Lock()
+        self.cache = LRUCache(capacity)
+        self.stats = LookupStats()
+        self.scrape_delay = scrape_delay
+
+        # 背景爬取佇列（避免同一單字重複排入；滿了就不再排入，以免對辭典網站送出過多查詢）
+        self._scrape_queue: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=max_pending)
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+        # 本次服務期間新爬取的結果，結束時寫回 final_查詢服務
+        self.new_records: List[Dict[str, str]] = []
+        self.new_missing: List[Dict] = []
+        self._results_lock = threading.Lock()
+
+    def preload(self) -> int:
+        """讀取 final_* 目錄的 JSON 結果作為語料，返回載入的單字數"""
+        records_by_word: Dict[str, List[Dict[str, str]]] = {}
+        missing_words = set()
+
+        # 依時間戳記由舊到新讀取，每個單字的記錄列表中較新的排在前面
+        json_files = sorted(Path(self.corpus_root).glob('final_*/*_final_*.json'),
+                            key=lambda p: p.stem.split('_final_')[-1])
+        for json_file in json_files:
+            try:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception as e:
+                print(f"   ⚠️ 無法讀取語料 {json_file}: {e}")
+                continue
+
+            for record in data.get('successful_records', []):
+                word_records = records_by_word.setdefault(record['word'], [])
+                # 同一例句只保留最新一筆
+                word_records[:] = [r for r in word_records
+                                   if r['taiwanese_sentence'] != record['taiwanese_sentence']]
+                word_records.insert(0, record)
+                missing_words.discard(record['word'])
+            for missing in data.get('missing_words', []):
+                if (missing.get('reason') in WordYieldScheduler.NEGATIVE_REASONS and
+                        missing['word'] not in records_by_word):
+                    missing_words.add(missing['word'])
+
+        with self._corpus_lock:
+            for word in missing_words:
+                self.corpus[word] = {'word': word, 'status': 'missing', 'records': []}
+            for word, records in records_by_word.items():
+                self.corpus[word] = {'word': word, 'status': 'found', 'records': records}
+
+        return len(records_by_word) + len(missing_words)
+
+    def lookup_json(self, word: str) -> str:
+        """查詢單一單字，返回 JSON
+
+        語料中沒有時排入背景爬取並立即返回 pending；爬取佇列已滿時返回 busy
+        """
+        cached = self.cache.get(word)
+        if cached is not None:
+            self.stats.record_lookup(True, True)
+            return cached
+
+        with self._corpus_lock:
+            entry = self.corpus.get(word)
+        if entry is None:
+            status = 'pending' if self._enqueue_scrape(word) else 'busy'
+            self.stats.record_lookup(False, False)
+            return json.dumps({'word': word, 'status': status, 'records': []}, ensure_ascii=False)
+
+        body = json.dumps(entry, ensure_ascii=False)
+        self.cache.put(word, body)
+        self.stats.record_lookup(True, False)
+        return body
+
+    def lookup_batch_json(self, words: List[str]) -> str:
+        """批次查詢，返回 {"results": [...]} 的 JSON"""
+        return '{"results": [' + ', '.join(self.lookup_json(word) for word in words) + ']}'
+
+    def status(self) -> Dict:
+        """服務狀態：語料與快取大小、佇列長度與查詢統計"""
+        snapshot = self.stats.snapshot()
+        with self._corpus_lock:
+            corpus_words = len(self.corpus)
+        with self._results_lock:
+            scraped = len(self.new_records) + len(self.new_missing)
+        snapshot.update({
+            'corpus_words': corpus_words,
+            'cached_words': len(self.cache),
+            'scrape_queue': self._scrape_queue.qsize(),
+            'scraped_this_session': scraped,
+        })
+        return snapshot
+
+    def _enqueue_scrape(self, word: str) -> bool:
+        """排入背景爬取，返回單字是否已在佇列中"""
+        with self._pending_lock:
+            if word in self._pending:
+                return True
+            try:
+                self._scrape_queue.put_nowait(word)
+            except queue.Full:
+                return False
+            self._pending.add(word)
+        return True
+
+    def _update_corpus(self, word: str, entry: Dict):
+        with self._corpus_lock:
+            self.corpus[word] = entry
+        self.cache.pop(word)
+
+    def start_worker(self):
+        """啟動背景爬取執行緒"""
+        self._worker = threading.Thread(target=self._scrape_loop, name='sutian-scrape-worker', daemon=True)
+        self._worker.start()
+
+    def _scrape_loop(self):
+        scraper = SutianFinalScraper()
+        try:
+            while not self._stop_event.is_set():
+                word = self._scrape_queue.get()
+                if word is None or self._stop_event.is_set():
+                    break
+
+                # 與管線模式相同：下載失敗記為「錯誤」，不與辭典沒有用例混淆
+                try:
+                    html = scraper.fetch_word_page(word)
+                    if html is None:
+                        record, status = None, "錯誤: 網頁載入失敗"
+                    else:
+                        examples = scraper._parse_webpage_examples(html, word)
+                        record, status = scraper.select_and_record(word, examples)
+                except Exception as e:
+                    record, status = None, f"錯誤: {e}"
+
+                with self._results_lock:
+                    if record:
+                        self.new_records.append(record)
+                    else:
+                        self.new_missing.append({
+                            'word': word,
+                            'reason': status,
+                            'index': len(self.new_records) + len(self.new_missing) + 1
+                        })
+
+                if record:
+                    self._update_corpus(word, {'word': word, 'status': 'found', 'records': [record]})
+                elif status in WordYieldScheduler.NEGATIVE_REASONS:
+                    self._update_corpus(word, {'word': word, 'status': 'missing', 'records': []})
+                # 暫時性錯誤不寫入語料，下次查詢可重新排入
+
+                with self._pending_lock:
+                    self._pending.discard(word)
+
+                # 模擬人工操作間隔，避免對伺服器造成負擔；停止時立即結束等待
+                self._stop_event.wait(self.scrape_delay)
+        finally:
+            scraper.cleanup()
+
+    def shutdown(self) -> Optional[Dict[str, str]]:
+        """停止背景爬取（佇列中尚未爬取的單字直接捨棄），並將本次新擷取的結果存成 final_查詢服務"""
+        if self._worker is not None:
+            self._stop_event.set()
+            try:
+                self._scrape_queue.put_nowait(None)
+            except queue.Full:
+                # 佇列已滿時背景執行緒不會卡在 get，會自行看到停止旗標
+                pass
+            self._worker.join(timeout=30)
+
+        with self._results_lock:
+            records = list(self.new_records)
+            missing = list(self.new_missing)
+
+        if not records and not missing:
+            return None
+
+        saver = SutianFinalScraper()
+        try:
+            return saver.save_results_with_missing_report(records, missing, "查詢服務")
+        finally:
+            saver.cleanup()
+
+class LookupRequestHandler(BaseHTTPRequestHandler):
+    """HTTP/JSON 介面
+
+    GET  /lookup?word=捷運
+    POST /lookup/batch  {"words": ["捷運", "卡車"]}
+    GET  /stats
+    """
+
+    service: SutianLookupService = None
+    max_batch_words = 1000
+
+    def _send_json(self, payload, status_code: int = 200):
+        body = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+        body = body.encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        start = time.perf_counter()
+        try:
+            self._handle_get()
+        finally:
+            self.service.stats.record_request((time.perf_counter() - start) * 1000)
+
+    def do_POST(self):
+        start = time.perf_counter()
+        try:
+            self._handle_post()
+        finally:
+            self.service.stats.record_request((time.perf_counter() - start) * 1000)
+
+    def _handle_get(self):
+        parsed = urllib.parse.urlparse(self.path)
+        params = urllib.parse.parse_qs(parsed.query)
+
+        if parsed.path == '/lookup':
+            word = params.get('word', [''])[0].strip()
+            if not word:
+                self._send_json({'error': '缺少 word 參數'}, 400)
+                return
+            self._send_json(self.service.lookup_json(word))
+        elif parsed.path == '/stats':
+            self._send_json(self.service.status())
+        else:
+            self._send_json({'error': '找不到路徑'}, 404)
+
+    def _handle_post(self):
+        if urllib.parse.urlparse(self.path).path != '/lookup/batch':
+            self._send_json({'error': '找不到路徑'}, 404)
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length).decode('utf-8'))
+            words = payload['words']
+        except Exception as e:
+            self._send_json({'error': f'請求格式錯誤: {e}'}, 400)
+            return
+
+        if not isinstance(words, list) or not all(isinstance(w, str) for w in words):
+            self._send_json({'error': '請求格式錯誤: words 必須是字串列表'}, 400)
+            return
+        if len(words) > self.max_batch_words:
+            self._send_json({'error': f'單次最多查詢 {self.max_batch_words} 個單字'}, 400)
+            return
+        words = [w.strip() for w in words if w.strip()]
+
+        self._send_json(self.service.lookup_batch_json(words))
+
+    def log_message(self, format, *args):
+        # 查詢量大時不逐筆輸出存取紀錄
+        pass
+
+def main():
+    """查詢服務主程式"""
+    parser = argparse.ArgumentParser(description='台語例句本機查詢服務')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--capacity', type=int, default=50000, help='LRU 熱門快取可保留的單字數')
+    parser.add_argument('--corpus-root', default='.', help='final_* 結果目錄所在位置')
+    parser.add_argument('--max-pending', type=int, default=200, help='背景爬取佇列最多可排入的單字數')
+    parser.add_argument('--max-batch', type=int, default=1000, help='批次查詢單次最多單字數')
+    args = parser.parse_args()
+
+    service = SutianLookupService(args.corpus_root, args.capacity, max_pending=args.max_pending)
+    loaded = service.preload()
+    print(f"📚 已預載 {loaded} 個單字")
+    service.start_worker()
+
+    LookupRequestHandler.service = service
+    LookupRequestHandler.max_batch_words = args.max_batch
+    server = ThreadingHTTPServer((args.host, args.port), LookupRequestHandler)
+    print(f"🌐 查詢服務啟動：http://{args.host}:{args.port}/lookup?word=捷運")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 正在停止查詢服務...")
+    finally:
+        server.server_close()
+        print(f"📊 查詢統計：{json.dumps(service.status(), ensure_ascii=False)}")
+        saved = service.shutdown()
+        if saved:
+            print(f"📁 新擷取結果儲存在：{saved['output_dir']}")
+
+if __name__ == "__main__":
+    main()